@@ -6,7 +6,7 @@ class AI_Agent:
         self.owner = owner
         self.description = description
         self.model_config = model_config
-        self.context = Context(history=[])
+        self.context = Context()
         self.task_complete = False
 
     def init_chat(self, guest_agent: "AI_Agent" = None):
@@ -4,7 +4,9 @@ from datetime import datetime
 
 from agent_marketplace.agents.ai_agent import AI_Agent
 from agent_marketplace.services.llm import OpenAILLMProvider
-from agent_marketplace.agents.personal_ai import CHECK_CHAT_STATE_PROMPT
+from agent_marketplace.agents.personal_ai import (
+    LIGHTWEIGHT_MODEL, render_check_chat_state_prompt, render_check_chat_state_system_prompt
+)
 from agent_marketplace.schemas.agents import Message
 from agent_marketplace.services.geocoding import get_coordinates_from_address
 from agent_marketplace.config import get_settings
@@ -50,7 +52,7 @@ class FoodDeliveryAgent(AI_Agent):
     def on_message(self, message: Message, sender: AI_Agent) -> Message:
         # Update context
         if message:
-            self.context.history.append(message)
+            self.context.append(message)
 
         # Generate response
         response = self.generate_response(message, sender)
@@ -58,7 +60,7 @@ class FoodDeliveryAgent(AI_Agent):
                                  timestamp=datetime.now(), metadata=response if "paymentDetails" in response else {})
 
         # Update context
-        self.context.history.append(return_message)
+        self.context.append(return_message)
 
         # Check if the task is complete
         if response == "[CONVERSATION_ENDS]":
@@ -128,19 +130,21 @@ class FoodDeliveryAgent(AI_Agent):
         """
         Check if the agent should complete the chat at this turn. If to complete chat, return "[CONVERSATION_ENDS]", otherwise return "[CONTINUE]".
         """
-        conversation_history = "\n".join([f"{msg.sender}: {msg.content}" for msg in self.context.history][-10:])
+        conversation_history = self.context.get_recent_str(10)
 
         if "[PAYMENT_SUCCEEDED]" in conversation_history or "[CONVERSATION_ENDS]" in conversation_history:
             return {"content": "[CONVERSATION_ENDS]"}
 
-        prompt = CHECK_CHAT_STATE_PROMPT.format(
-            agent_name=self.name,
+        system_prompt = render_check_chat_state_system_prompt(
             owner=self.owner,
             user_intent=self.user_intent,
             service_agent_description=self.description,
+        )
+        prompt = render_check_chat_state_prompt(
+            agent_name=self.name,
             conversation_history=conversation_history,
         )
 
         llm_call = OpenAILLMProvider()
-        response = llm_call.generate(prompt=prompt)
+        response = llm_call.generate(prompt=prompt, system_prompt=system_prompt, model=LIGHTWEIGHT_MODEL, max_tokens=64)
         return response
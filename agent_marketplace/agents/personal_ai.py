@@ -1,15 +1,133 @@
 import os
-import json
+import asyncio
+import orjson
 from datetime import datetime
+from typing import Any, Callable
 from textwrap import dedent
 import streamlit as st
 
 from agent_marketplace.agents.ai_agent import AI_Agent
 from agent_marketplace.config import get_settings
 from agent_marketplace.schemas.agents import Message
-from agent_marketplace.services.llm import OpenAILLMProvider
+from agent_marketplace.services.llm import OpenAILLMProvider, run_concurrently, run_coroutine
+from agent_marketplace.services.cache import InMemoryCache
 from agent_marketplace.tools import registered_tools
-from agent_marketplace.config import response_generator
+from agent_marketplace.config import compile_template, response_generator
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def _load_personal_files(personal_data_dir: str, data_version: tuple[tuple[str, float], ...]) -> dict[str, dict]:
+    """
+    Load every JSON file in the personal data directory, keyed by file name without extension
+
+    `data_version` is only part of the cache key, so changed data files are read again instead of served stale.
+    """
+    with os.scandir(personal_data_dir) as it:
+        entries = sorted((entry for entry in it if entry.name.endswith(".json")), key=lambda entry: entry.name)
+    personal_data = {}
+    for entry in entries:
+        with open(entry.path, "rb") as f:
+            personal_data[entry.name[:-len(".json")]] = orjson.loads(f.read())
+    return personal_data
+
+
+def _personal_data_version(personal_data_dir: str) -> tuple[tuple[str, float], ...]:
+    """
+    Sorted (file name, modification time) pairs of the personal data files, used to invalidate cached summaries
+
+    Unlike the latest modification time alone, this also changes when a file is deleted or added with an older
+    modification time, e.g. copied with `cp -p` or extracted from an archive.
+    """
+    with os.scandir(personal_data_dir) as it:
+        return tuple(sorted((entry.name, entry.stat().st_mtime) for entry in it if entry.name.endswith(".json")))
+
+
+@st.cache_data(show_spinner=False)
+def _summarize_personal_data(_agent: "PersonalAI", _sender: AI_Agent, owner: str, sender_name: str,
+                             sender_description: str, user_intent: str, personal_data_dir: str,
+                             data_version: tuple[tuple[str, float], ...]) -> tuple[str, dict[str, str], str]:
+    """
+    Run the LLM calls that summarize the owner's personal data for a service agent
+
+    Cached per owner and service agent, streamlit reruns skip the LLM calls until the data files change.
+    Arguments prefixed with an underscore are not part of the cache key.
+
+    Returns:
+        Tuple of (basic info summary, relevant info per data file, personal preferences summary)
+    """
+    personal_data = _load_personal_files(personal_data_dir, data_version)
+    basic_info = personal_data.pop("basic_info")
+
+    # Get basic info and personal preferences concurrently, the LLM calls are independent.
+    # All preference files are searched in a single LLM call
+    basic_info_response, p_info_by_name = run_concurrently(
+        _agent.llm_call_to_summarize_personal_preferences(
+            _sender, orjson.dumps(basic_info, option=orjson.OPT_INDENT_2).decode()
+        ),
+        _agent.llm_call_to_retrieve_all_personal_info(_sender, personal_data),
+    )
+
+    # Summarize personal preferences
+    prompt = render_summarize_personal_preferences_prompt(
+        owner_personal_data="\n\n".join(p_info_by_name.values())
+    )
+    preferences = _agent.llm.generate(prompt=prompt, temperature=0)["content"]
+    return basic_info_response["content"], p_info_by_name, preferences
+
+
+def _parse_personal_info_by_source(content: str | None, source_names: list[str]) -> dict[str, str]:
+    """
+    Parse the JSON reply of the batched personal info retrieval into one paragraph per data source
+
+    Keys are matched to source names exactly, then ignoring case, "## " and ".json". If no key matches but
+    the reply has one value per source, values are matched by position. Sources without a paragraph are
+    left out and reported, as are empty paragraphs.
+
+    Raises:
+        ValueError: If the reply is not a JSON object or no paragraph matches any source
+    """
+    if not content:
+        raise ValueError("Empty response when retrieving personal info")
+    try:
+        reply = orjson.loads(content)
+    except orjson.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON when retrieving personal info, the response may be truncated: {e}")
+    if not isinstance(reply, dict):
+        raise ValueError(f"Expected a JSON object when retrieving personal info, got {type(reply).__name__}")
+
+    def normalize(name: str) -> str:
+        name = name.strip().lstrip("#").strip().lower()
+        return name[:-len(".json")] if name.endswith(".json") else name
+
+    def to_paragraph(value: Any) -> str:
+        if isinstance(value, str):
+            return value.strip()
+        return orjson.dumps(value).decode()
+
+    values_by_key = {normalize(key): value for key, value in reply.items()}
+    p_info_by_name = {}
+    for name in source_names:
+        if name in reply:
+            p_info_by_name[name] = to_paragraph(reply[name])
+        elif normalize(name) in values_by_key:
+            p_info_by_name[name] = to_paragraph(values_by_key[normalize(name)])
+
+    if not p_info_by_name and len(reply) == len(source_names):
+        print(f"Personal info keys {list(reply)} do not match sources {source_names}, matching by position")
+        p_info_by_name = {name: to_paragraph(value) for name, value in zip(source_names, reply.values())}
+
+    p_info_by_name = {name: p_info for name, p_info in p_info_by_name.items() if p_info}
+    if not p_info_by_name:
+        raise ValueError(f"No personal info found for sources {source_names} in response keys {list(reply)}")
+    missing = [name for name in source_names if name not in p_info_by_name]
+    if missing:
+        print(f"No personal info retrieved for sources {missing}")
+    return p_info_by_name
+
+
+# Model for short classification calls such as validation and chat state checks
+LIGHTWEIGHT_MODEL = "gpt-4o-mini"
+
 
 class PersonalAI(AI_Agent):
     def __init__(self, name: str, owner: str, description: str, user_intent: str, model_config: dict = {}):
@@ -17,10 +135,13 @@ class PersonalAI(AI_Agent):
         self.settings = get_settings()
         self.personal_basic_info: str = ""
         self.personal_preferences: dict[str, str] = {}
+        self._owner_info_by_sender: dict[str, str] = {}
+        self._system_prompts: dict[tuple[Callable[..., str], str], str] = {}
         self.user_intent: str = user_intent
 
         self.llm = OpenAILLMProvider()
         self.tools = registered_tools
+        self.idempotent_tool_results = InMemoryCache(maxsize=128)
 
     def init_chat(self, guest_agent: AI_Agent = None):
         # Retrieve personal information based on the guest agent
@@ -29,20 +150,22 @@ class PersonalAI(AI_Agent):
     def on_message(self, message: Message, sender: AI_Agent) -> Message:
         # Update context
         if message.content:
-            self.context.history.append(message)
+            self.context.append(message)
+        # Summarize older turns instead of dropping them once the history grows long, at most once per turn
+        self.context.compact(self.llm_call_to_summarize_history)
 
         # Generate response
         response = self.generate_response(message, sender)
 
         # Update context
-        if response:
-            self.context.history.append(Message(role="user", content=response["content"], sender=self.name, receiver=sender.name, timestamp=datetime.now()))
+        return_message = Message(role="user", content=response["content"], sender=self.name, receiver=sender.name, timestamp=datetime.now())
+        self.context.append(return_message)
 
         # Check if the task is complete
-        if response == "[CONVERSATION_ENDS]":
+        if response.get("content") == "[CONVERSATION_ENDS]":
             self.task_complete = True
 
-        return Message(role="user", content=response["content"], sender=self.name, receiver=sender.name, timestamp=datetime.now())
+        return return_message
 
     def retrieve_personal_preferences(self, sender: AI_Agent) -> str:
         print(f"Retrieving personal preferences for \033[1;33m{self.owner}\033[0m")
@@ -55,27 +178,23 @@ class PersonalAI(AI_Agent):
             if not os.path.exists(personal_data_dir):
                 raise ValueError(f"Personal data directory {personal_data_dir} does not exist. Is the client name correct?")
 
-            # Get basic info
-            self.personal_basic_info = self.llm_call_to_summarize_personal_preferences(sender, open(os.path.join(personal_data_dir, "basic_info.json")).read())
-
-            # Get personal preferences
-            personal_preferences = []
-            for file in os.listdir(personal_data_dir):
-                if file.endswith(".json") and file != "basic_info.json":
-                    personal_data = json.load(open(os.path.join(personal_data_dir, file)))
-                    p_info = self.llm_call_to_retrieve_personal_info(sender, personal_data)["content"]
-                    st.write_stream(
-                        response_generator(f"Searching in **{os.path.splitext(file)[0]}** ...")
-                    )
-                    st.write_stream(
-                        response_generator(p_info)
-                    )
-                    personal_preferences.append(p_info)
+            data_version = _personal_data_version(personal_data_dir)
+            self.personal_basic_info, p_info_by_name, self.personal_preferences[sender.name] = _summarize_personal_data(
+                self, sender, self.owner, sender.name, sender.description, self.user_intent, personal_data_dir, data_version
+            )
+            self._owner_info_by_sender[sender.name] = "\n\n".join([self.personal_basic_info, self.personal_preferences[sender.name]])
+            self._system_prompts.clear()
+
+            # Render outside the cached summary so reruns still show the results
+            for name, p_info in p_info_by_name.items():
+                st.write_stream(
+                    response_generator(f"Searching in **{name}** ...")
+                )
+                st.write_stream(
+                    response_generator(p_info)
+                )
         
         with st.chat_message("user"):
-            # Summarize personal preferences
-            personal_preferences = self.llm_call_to_summarize_personal_preferences(sender, "\n\n".join(personal_preferences))
-            self.personal_preferences[sender.name] = personal_preferences["content"]
             st.write_stream(
                 response_generator(f"✅ **Summarizing :blue[{self.owner}]'s personal preferences**")
             )
@@ -93,27 +212,35 @@ class PersonalAI(AI_Agent):
         # """)
 
     def generate_response(self, message: Message, sender: AI_Agent) -> str:
-        # Check if the task is complete
-        chat_state = self.llm_call_to_check_chat_state(sender)
+        # Check if the task is complete while generating the first response
+        chat_state, response = run_coroutine(self.check_chat_state_and_generate_response(sender))
         if chat_state["content"] == "[CONVERSATION_ENDS]":
             self.task_complete = True
             return {"content": "[CONVERSATION_ENDS]"}
 
+        # Tool results of this turn, so retries do not repeat side effects such as payments
+        tool_results = {}
         retry = 0
         validator_response = {}
         while retry < 3:
-            # Generate response
-            response = self.llm_call_to_generate_response(sender, validator_response)
+            # Generate response, the first attempt was generated alongside the chat state check
+            if retry > 0:
+                response = self.llm_call_to_generate_response(sender, validator_response)
 
             # Tool call
             if response["tool_calls"]:
+                called_in_response = set()
                 for tool_call in response["tool_calls"]:
                     tool_func_name = tool_call.function.name
-                    tool_func_args = tool_call.function.arguments
-                    tool_func_result = self.tools[tool_func_name](tool_func_args, message)
+                    tool_key = (tool_func_name, tool_call.function.arguments)
+                    # Skip duplicate calls emitted in the same response
+                    if tool_key in called_in_response:
+                        continue
+                    called_in_response.add(tool_key)
+                    tool_func_result = self.call_tool(tool_func_name, tool_call.function.arguments, message, tool_results)
                     
                     # Update context
-                    self.context.history.append(
+                    self.context.append(
                         Message(role="user", 
                                 content=f"{tool_func_result}", 
                                 sender=f"[{tool_func_name}] tool", 
@@ -130,77 +257,184 @@ class PersonalAI(AI_Agent):
                 return response
             
             # Remove the last message from the context
-            self.context.history.pop()
+            self.context.pop()
             
             retry += 1
 
         return response
 
+    async def check_chat_state_and_generate_response(self, sender: AI_Agent) -> tuple[dict, dict | None]:
+        """
+        Run the chat state check and the first response generation concurrently. Most turns continue,
+        so the generated response is only discarded when the conversation ends.
+        """
+        response_task = asyncio.create_task(self.allm_call_to_generate_response(sender))
+        try:
+            chat_state = await self.allm_call_to_check_chat_state(sender)
+        except BaseException:
+            response_task.cancel()
+            raise
+
+        # Check the state before waiting on the generation, so an ending chat neither waits for
+        # the discarded response nor fails if generating it raised
+        if chat_state["content"] == "[CONVERSATION_ENDS]":
+            response_task.cancel()
+            response_task.add_done_callback(lambda task: task.cancelled() or task.exception())
+            return chat_state, None
+        return chat_state, await response_task
+
+    def call_tool(self, tool_func_name: str, tool_func_args: str, message: Message, tool_results: dict) -> str:
+        """
+        Call a registered tool, reusing the result of an identical call made earlier in the turn.
+        Results of tools marked `idempotent` are also reused across turns.
+        """
+        tool_key = (tool_func_name, tool_func_args)
+        if tool_key in tool_results:
+            return tool_results[tool_key]
+
+        tool = self.tools[tool_func_name]
+        idempotent = getattr(tool, "idempotent", False)
+        cache_key = f"{tool_func_name}:{tool_func_args}"
+        tool_func_result = self.idempotent_tool_results.lookup(cache_key) if idempotent else None
+        if tool_func_result is None:
+            try:
+                tool_func_args_dict = orjson.loads(tool_func_args or "{}")
+            except orjson.JSONDecodeError as e:
+                return f"[TOOL_FAILED] Invalid arguments for {tool_func_name}: {str(e)}. Please call the tool again with valid JSON arguments."
+            tool_func_result = tool(tool_func_args_dict, message)
+            if idempotent:
+                self.idempotent_tool_results.update(cache_key, tool_func_result)
+
+        tool_results[tool_key] = tool_func_result
+        return tool_func_result
+
+    def _system_prompt(self, render: Callable[..., str], sender: AI_Agent) -> str:
+        """Render a system prompt once per service agent, its fields do not change during a chat"""
+        key = (render, sender.name)
+        if key not in self._system_prompts:
+            self._system_prompts[key] = render(
+                self_name=self.name,
+                owner=self.owner,
+                owner_personal_info=self._owner_info_by_sender.get(sender.name, ""),
+                user_intent=self.user_intent,
+                service_agent_name=sender.name,
+                service_agent_description=sender.description,
+            )
+        return self._system_prompts[key]
+
     def llm_call_to_validate_response(self, input_message: str, sender: AI_Agent) -> dict:
-        prompt = VALIDATE_RESPONSE_PROMPT.format(
-            owner=self.owner,
-            user_intent=self.user_intent,
-            service_agent_description=sender.description,
-            conversation_history="\n".join([f"{msg.sender}: {msg.content}" for msg in self.context.history][-10:]),
+        system_prompt = self._system_prompt(render_validate_response_system_prompt, sender)
+        prompt = render_validate_response_prompt(
+            conversation_history=self.context.get_history_str(),
             input_message=input_message
         )
-        response = self.llm.generate(prompt=prompt)
+        response = self.llm.generate(
+            prompt=prompt, system_prompt=system_prompt, model=LIGHTWEIGHT_MODEL, max_tokens=128
+        )
         if response["content"] != "[YES]":
-            response["content"] = f"# Notes\nPlease do not generate response like this: \n{input_message}\n\nThe reason is: \n{response['content']}"
+            response["content"] = "".join([
+                "# Notes\nPlease do not generate response like this: \n", input_message,
+                "\n\nThe reason is: \n", response["content"],
+            ])
         return response
     
     def llm_call_to_check_chat_state(self, sender: AI_Agent) -> dict:
-        conversation_history = "\n".join([f"{msg.sender}: {msg.content}" for msg in self.context.history][-10:])
-        
-        if "[PAYMENT_SUCCEEDED]" in conversation_history:
+        chat_state = self._check_chat_state_heuristics()
+        if chat_state:
+            return chat_state
+        system_prompt, prompt = self._check_chat_state_prompts(sender)
+        response = self.llm.generate(
+            prompt=prompt, system_prompt=system_prompt, model=LIGHTWEIGHT_MODEL, max_tokens=64
+        )
+        return response
+
+    async def allm_call_to_check_chat_state(self, sender: AI_Agent) -> dict:
+        chat_state = self._check_chat_state_heuristics()
+        if chat_state:
+            return chat_state
+        system_prompt, prompt = self._check_chat_state_prompts(sender)
+        response = await self.llm.agenerate(
+            prompt=prompt, system_prompt=system_prompt, model=LIGHTWEIGHT_MODEL, max_tokens=64
+        )
+        return response
+
+    def _check_chat_state_heuristics(self) -> dict | None:
+        """Cheap checks run before the LLM is asked, returns None when they are inconclusive"""
+        conversation_history = self.context.get_history_str()
+        if "[CONVERSATION_ENDS]" in conversation_history or "[PAYMENT_SUCCEEDED]" in conversation_history:
             return {"content": "[CONVERSATION_ENDS]"}
-        
-        prompt = CHECK_CHAT_STATE_PROMPT.format(
+
+        # The conversation is stalled if the last two responses of this agent are identical
+        own_messages = [msg.content for msg in self.context.recent(10) if msg.sender == self.name]
+        if len(own_messages) >= 2 and own_messages[-1] == own_messages[-2]:
+            return {"content": "[CONVERSATION_ENDS]"}
+        return None
+
+    def _check_chat_state_prompts(self, sender: AI_Agent) -> tuple[str, str]:
+        system_prompt = self._system_prompt(render_check_chat_state_system_prompt, sender)
+        prompt = render_check_chat_state_prompt(
             agent_name=self.name,
-            owner=self.owner,
-            user_intent=self.user_intent,
-            service_agent_description=sender.description,
-            conversation_history=conversation_history,
+            conversation_history=self.context.get_history_str(),
         )
-        response = self.llm.generate(prompt=prompt)
-        return response
-    
+        return system_prompt, prompt
+
     def llm_call_to_generate_response(self, sender: AI_Agent, validator_response: dict = {}) -> dict:
-        # Generate response
-        prompt = GENERATE_RESPONSE_PROMPT.format(
-            owner=self.owner,
-            owner_personal_info=f"{self.personal_basic_info}\n\n{self.personal_preferences[sender.name]}",
+        system_prompt, prompt = self._generate_response_prompts(sender, validator_response)
+        response = self.llm.generate(prompt=prompt, system_prompt=system_prompt, tools=PERSONAL_AI_TOOLS)
+        return response
+
+    async def allm_call_to_generate_response(self, sender: AI_Agent, validator_response: dict = {}) -> dict:
+        system_prompt, prompt = self._generate_response_prompts(sender, validator_response)
+        response = await self.llm.agenerate(prompt=prompt, system_prompt=system_prompt, tools=PERSONAL_AI_TOOLS)
+        return response
+
+    def _generate_response_prompts(self, sender: AI_Agent, validator_response: dict) -> tuple[str, str]:
+        system_prompt = self._system_prompt(render_generate_response_system_prompt, sender)
+
+        prompt = render_generate_response_prompt(
             service_agent_name=sender.name,
-            service_agent_description=sender.description,
-            conversation_history="\n".join([f"{msg.sender}: {msg.content}" for msg in self.context.history][-10:]),
-            user_intent=self.user_intent,
-            validator_message=validator_response["content"] if validator_response else "",
+            conversation_history=self.context.get_history_str(),
             self_name=self.name
         )
-        response = self.llm.generate(prompt=prompt, tools=PERSONAL_AI_TOOLS)
-        return response
+        if validator_response:
+            prompt = "\n".join([prompt, validator_response["content"]])
+        return system_prompt, prompt
+
+    async def llm_call_to_retrieve_all_personal_info(self, sender: AI_Agent, owner_personal_data: dict) -> dict[str, str]:
+        """Retrieve the relevant personal info from every data source at once, keyed by source name"""
+        system_prompt = self._system_prompt(render_retrieve_personal_info_system_prompt, sender)
+        prompt = render_retrieve_personal_info_prompt(
+            owner_personal_data="\n\n".join(
+                f"## {name}\n{orjson.dumps(data).decode()}" for name, data in owner_personal_data.items()
+            )
+        )
+        # Deterministic extraction, so the response cache can answer identical requests
+        response = await self.llm.agenerate(
+            prompt=prompt, system_prompt=system_prompt, response_format={"type": "json_object"}, temperature=0
+        )
+        return _parse_personal_info_by_source(response["content"], list(owner_personal_data))
 
-    def llm_call_to_retrieve_personal_info(self, sender: AI_Agent, owner_personal_data: str) -> dict:
-        prompt = RETRIEVE_PERSONAL_INFO_PROMPT.format(
-            owner=self.owner,
-            service_agent_name=sender.name,
-            service_agent_description=sender.description,
-            user_intent=self.user_intent,
+    async def llm_call_to_summarize_personal_preferences(self, sender: AI_Agent, owner_personal_data: str) -> dict:
+        prompt = render_summarize_personal_preferences_prompt(
             owner_personal_data=owner_personal_data
         )
-        response = self.llm.generate(prompt=prompt)
+        # The basic info summary does not depend on the service agent, so it is shared across agents
+        response = await self.llm.agenerate(prompt=prompt, temperature=0)
         return response
 
-    def llm_call_to_summarize_personal_preferences(self, sender: AI_Agent, owner_personal_data: str) -> dict:
-        prompt = SUMMARIZE_PERSONAL_PREFERENCES_PROMPT.format(
-            owner_personal_data=owner_personal_data
+    def llm_call_to_summarize_history(self, conversation_history: str) -> str:
+        prompt = render_summarize_history_prompt(
+            owner=self.owner,
+            conversation_history=conversation_history
         )
         response = self.llm.generate(prompt=prompt)
-        return response
-
+        return response["content"]
 
 # Prompt templates for Personal AI
-GENERATE_RESPONSE_PROMPT = """
+# Each prompt is split into a system prompt holding the stable fields, which stays byte-identical
+# across turns for the same service agent so OpenAI can serve it from its prompt cache, and a user
+# prompt holding the conversation history and the task.
+GENERATE_RESPONSE_SYSTEM_PROMPT = """
 You are {self_name}. You fulfill task on behalf of {owner}.
 You will be chatting with a service agent {service_agent_name} to complete a task.
 You are provided the {owner}'s personal information and the description of the service agent.
@@ -213,17 +447,18 @@ You are provided the {owner}'s personal information and the description of the s
 
 # Service agent's description
 {service_agent_description}
+"""
 
+# Notes from the validator are appended after this prompt when a response is retried
+GENERATE_RESPONSE_PROMPT = """
 # Conversation history
 {conversation_history}
 
-{validator_message}
-
 # Task for you
 You are {self_name} to generate a response to {service_agent_name}. Do not include {self_name} at the beginning of your response. If you find it difficult to complete the task after a few attempts, end the conversation politely.
 """
 
-CHECK_CHAT_STATE_PROMPT = """
+CHECK_CHAT_STATE_SYSTEM_PROMPT = """
 Here is a conversation history between {owner}'s personal AI agent and the service agent.
 The conversation is about to complete a task.
 
@@ -232,7 +467,9 @@ The conversation is about to complete a task.
 
 # Description of the service agent:
 {service_agent_description}
+"""
 
+CHECK_CHAT_STATE_PROMPT = """
 # Conversation history
 
 {conversation_history}
@@ -247,7 +484,7 @@ Here are states you can choose from:
 Only reply with one of the states above.
 """
 
-VALIDATE_RESPONSE_PROMPT = """
+VALIDATE_RESPONSE_SYSTEM_PROMPT = """
 Here is a conversation history between {owner}'s personal AI agent and the service agent.
 The conversation is about to complete a task.
 
@@ -256,7 +493,9 @@ The conversation is about to complete a task.
 
 # Description of the service agent:
 {service_agent_description}
+"""
 
+VALIDATE_RESPONSE_PROMPT = """
 # Conversation history
 {conversation_history}
 
@@ -269,7 +508,7 @@ If you think the response is appropriate, please only reply with [YES].
 If you think the response is not appropriate, please reply with one paragraph to explain why the response is not appropriate.
 """
 
-RETRIEVE_PERSONAL_INFO_PROMPT = """
+RETRIEVE_PERSONAL_INFO_SYSTEM_PROMPT = """
 I am doing a task for my client {owner}. The agent I am working with is {service_agent_name}.
 
 # The task description from my client
@@ -279,9 +518,14 @@ I am doing a task for my client {owner}. The agent I am working with is {service
 {service_agent_description}
 
 # Your task
-Search through {owner}'s personal information and select the information that is relevant to the task and the service agent.
-Based on the selected personal info, estimate the personal information for the task and service agent. Generate one single paragraph of 50 words.
+The personal information of my client is split into several sources, each under a "## <source name>" heading.
+For each source, search through {owner}'s personal information and select the information that is relevant to the task and the service agent.
+Based on the selected personal info, estimate the personal information for the task and service agent. Generate one single paragraph of 50 words per source.
+
+Reply with a JSON object that maps each source name to its paragraph.
+"""
 
+RETRIEVE_PERSONAL_INFO_PROMPT = """
 # The personal information of my client
 
 {owner_personal_data}
@@ -294,6 +538,26 @@ Please summarize the following personal information into one single paragraph of
 {owner_personal_data}
 """
 
+SUMMARIZE_HISTORY_PROMPT = """
+Please summarize the following conversation between {owner}'s personal AI agent and the service agent into one single paragraph.
+Keep every detail that is needed to continue the task, such as the choices made, order details, prices, addresses and payment status.
+
+# Conversation history
+{conversation_history}
+"""
+
+# Templates are parsed once at import, rendering a prompt only joins the pre-split segments
+render_generate_response_system_prompt = compile_template(GENERATE_RESPONSE_SYSTEM_PROMPT)
+render_generate_response_prompt = compile_template(GENERATE_RESPONSE_PROMPT)
+render_check_chat_state_system_prompt = compile_template(CHECK_CHAT_STATE_SYSTEM_PROMPT)
+render_check_chat_state_prompt = compile_template(CHECK_CHAT_STATE_PROMPT)
+render_validate_response_system_prompt = compile_template(VALIDATE_RESPONSE_SYSTEM_PROMPT)
+render_validate_response_prompt = compile_template(VALIDATE_RESPONSE_PROMPT)
+render_retrieve_personal_info_system_prompt = compile_template(RETRIEVE_PERSONAL_INFO_SYSTEM_PROMPT)
+render_retrieve_personal_info_prompt = compile_template(RETRIEVE_PERSONAL_INFO_PROMPT)
+render_summarize_personal_preferences_prompt = compile_template(SUMMARIZE_PERSONAL_PREFERENCES_PROMPT)
+render_summarize_history_prompt = compile_template(SUMMARIZE_HISTORY_PROMPT)
+
 # Personal AI tools descriptions
 PERSONAL_AI_TOOLS = [
     {
@@ -1,9 +1,10 @@
 import os
 import time
 import re
+import string
 import streamlit as st
 
-from typing import Optional
+from typing import Callable, Optional
 from pydantic_settings import BaseSettings
 from functools import lru_cache
 from dotenv import load_dotenv
@@ -39,4 +40,25 @@ def response_generator(response):
     words = re.split(r'(\s+)', response)
     for word in words:
         yield word
-        time.sleep(0.01) 
+        time.sleep(0.01)
+
+
+def compile_template(template: str) -> Callable[..., str]:
+    """
+    Pre-parse a str.format template so rendering only joins its segments
+
+    The returned function takes the template fields as keyword arguments, extra ones are ignored.
+    """
+    segments = []
+    for literal, field, format_spec, conversion in string.Formatter().parse(template):
+        if format_spec or conversion:
+            raise ValueError(f"Unsupported format spec in template field {{{field}}}")
+        if literal:
+            segments.append((literal, None))
+        if field is not None:
+            segments.append((None, field))
+
+    def render(**fields) -> str:
+        return "".join([literal if field is None else str(fields[field]) for literal, field in segments])
+
+    return render
@@ -1,6 +1,14 @@
+from collections import deque
 from datetime import datetime
+from itertools import islice
+from typing import Callable
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, PrivateAttr, field_validator
+
+# Sender of the message that replaces compacted history
+SUMMARY_SENDER = "[summary]"
+# Maximum number of messages kept in history, the oldest are dropped first
+MAX_HISTORY = 256
 
 class Message(BaseModel):
     role: str
@@ -11,4 +19,82 @@ class Message(BaseModel):
     metadata: dict | None = None
 
 class Context(BaseModel):
-    history: list[Message]
\ No newline at end of file
+    history: deque[Message] = Field(default_factory=lambda: deque(maxlen=MAX_HISTORY))
+
+    # Rendered history keyed by the number of recent messages, reset whenever history changes
+    _str_cache: dict[int, str] = PrivateAttr(default_factory=dict)
+
+    @field_validator("history", mode="after")
+    @classmethod
+    def _bound_history(cls, history: deque[Message]) -> deque[Message]:
+        return deque(history, maxlen=MAX_HISTORY)
+
+    def append(self, message: Message) -> None:
+        if len(self.history) == self.history.maxlen and self.history[0].sender == SUMMARY_SENDER:
+            # Evict the oldest message after the summary instead of the summary itself
+            summary = self.history.popleft()
+            self.history.popleft()
+            self.history.appendleft(summary)
+        self.history.append(message)
+        self._str_cache.clear()
+
+    def pop(self) -> Message:
+        message = self.history.pop()
+        self._str_cache.clear()
+        return message
+
+    def compact(self, summarizer: Callable[[str], str], threshold_tokens: int = 2000, keep_last: int = 6) -> bool:
+        """
+        Summarize older messages into a single summary message once they grow past the threshold
+
+        Only messages older than the last `keep_last` count towards the threshold, the previous summary
+        does not, so after compacting the summarizer is not called again until that many new tokens of
+        older history have accumulated. The previous summary is passed to the summarizer with the older
+        messages and replaced. The summary stays at the start of history, so the rendered history keeps
+        a stable prefix across turns while the most recent messages are kept verbatim. Render the compacted
+        history with `get_history_str`, which keeps every message after the summary.
+
+        Args:
+            summarizer (Callable[[str], str]): Summarizes rendered "sender: content" lines into a paragraph
+            threshold_tokens (int): Estimated number of tokens (4 characters each) that triggers compaction
+            keep_last (int): Number of most recent messages kept verbatim
+
+        Returns:
+            bool: Whether history was compacted
+        """
+        if len(self.history) <= keep_last:
+            return False
+        older = list(islice(self.history, 0, len(self.history) - keep_last))
+        if sum(len(msg.content) for msg in older if msg.sender != SUMMARY_SENDER) // 4 <= threshold_tokens:
+            return False
+        recent = self.recent(keep_last)
+
+        summary = Message(
+            role="system",
+            content=summarizer("\n".join(f"{msg.sender}: {msg.content}" for msg in older)),
+            sender=SUMMARY_SENDER,
+            receiver=older[-1].receiver,
+            timestamp=datetime.now(),
+        )
+        self.history = deque([summary, *recent], maxlen=MAX_HISTORY)
+        self._str_cache.clear()
+        return True
+
+    def recent(self, n: int) -> list[Message]:
+        """Return the last n messages in chronological order"""
+        recent = list(islice(reversed(self.history), 0, n))
+        recent.reverse()
+        return recent
+
+    def get_recent_str(self, n: int = 10) -> str:
+        """Render the last n messages as "sender: content" lines, always keeping the history summary"""
+        if n not in self._str_cache:
+            recent = self.recent(n)
+            if len(self.history) > n and self.history[0].sender == SUMMARY_SENDER:
+                recent = [self.history[0], *recent]
+            self._str_cache[n] = "\n".join(f"{msg.sender}: {msg.content}" for msg in recent)
+        return self._str_cache[n]
+
+    def get_history_str(self) -> str:
+        """Render the whole history, the summary of compacted messages followed by every later message"""
+        return self.get_recent_str(len(self.history))
@@ -0,0 +1,39 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class InMemoryCache:
+    def __init__(self, maxsize: Optional[int] = None):
+        """
+        Thread-safe in-memory key-value cache
+
+        Args:
+            maxsize (int, optional): Maximum number of entries to keep. The least recently
+                used entry is evicted when full. Unbounded if not provided.
+        """
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def update(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if self.maxsize is not None and len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
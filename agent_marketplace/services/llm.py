@@ -1,21 +1,81 @@
 import os
-from typing import Dict, List, Any, Optional, Union
-from openai import OpenAI
+import asyncio
+import hashlib
+import threading
+import httpx
+import orjson
+from functools import lru_cache
+from typing import Any, Coroutine, Dict, List, Optional, TypeVar, Union
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
 
 from agent_marketplace.config import get_settings
 from agent_marketplace.schemas.agents import Context
+from agent_marketplace.services.cache import InMemoryCache
+
+T = TypeVar("T")
+
+# Event loop shared by all async LLM calls, see run_coroutine
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+_event_loop_lock = threading.Lock()
+
+
+def run_coroutine(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine on a background event loop and wait for its result
+
+    All async LLM calls run on the same long-lived loop, off the streamlit script thread, so the
+    async client's connection pool stays bound to one loop instead of a new loop per asyncio.run.
+    """
+    global _event_loop
+    with _event_loop_lock:
+        if _event_loop is None:
+            _event_loop = asyncio.new_event_loop()
+            threading.Thread(target=_event_loop.run_forever, name="llm-event-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _event_loop).result()
+
+
+def run_concurrently(*coros: Coroutine[Any, Any, Any]) -> List[Any]:
+    """Run coroutines concurrently with asyncio.gather on the background event loop"""
+    async def gather() -> List[Any]:
+        return await asyncio.gather(*coros)
+    return run_coroutine(gather())
+
+
+# Keep-alive pool shared by every agent, module state outlives streamlit reruns
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40)
+
+
+@lru_cache(maxsize=4)
+def _get_client(api_key: Optional[str]) -> OpenAI:
+    return OpenAI(api_key=api_key, http_client=DefaultHttpxClient(limits=HTTP_LIMITS))
+
+
+@lru_cache(maxsize=4)
+def _get_async_client(api_key: Optional[str]) -> AsyncOpenAI:
+    # Only used on the background event loop of run_coroutine, so its connections stay bound to one loop
+    return AsyncOpenAI(api_key=api_key, http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS))
+
 
 class OpenAILLMProvider:
+    # Responses are shared by all providers, so identical prompts issued across
+    # agents and streamlit reruns are answered without another API round trip
+    response_cache = InMemoryCache(maxsize=1024)
+
     def __init__(self, config: Optional[Dict[str, Any]] = None):
         self.config = config or {}
         self.settings = get_settings()
         self.api_key = self.config.get("api_key") or self.settings.openai_api_key or os.getenv("OPENAI_API_KEY")
         self.model = self.config.get("model", "gpt-4o")
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = _get_client(self.api_key)
+        self.async_client = _get_async_client(self.api_key)
         
     def generate(self, prompt: str, system_prompt: str = "", context: Context = None, 
                  tools: Optional[List[Dict[str, Any]]] = None, 
-                 tool_choice: Optional[Union[str, Dict[str, Any]]] = "auto") -> Dict[str, Any]:
+                 tool_choice: Optional[Union[str, Dict[str, Any]]] = "auto",
+                 response_format: Optional[Dict[str, Any]] = None,
+                 model: Optional[str] = None, max_tokens: Optional[int] = None,
+                 temperature: Optional[float] = None,
+                 cache: Optional[bool] = None) -> Dict[str, Any]:
         """
         Generate text using LLM with optional tool support
         
@@ -25,6 +85,12 @@ class OpenAILLMProvider:
             context (Context, optional): Conversation history and context
             tools (List[Dict[str, Any]], optional): List of tools in OpenAI format for function calling
             tool_choice (Union[str, Dict[str, Any]], optional): Tool choice parameter - "auto", "none", or specific tool config
+            response_format (Dict[str, Any], optional): Response format, e.g. {"type": "json_object"}
+            model (str, optional): Model for this call, overrides the configured model
+            max_tokens (int, optional): Maximum number of tokens for this call, overrides the configured limit
+            temperature (float, optional): Sampling temperature for this call, overrides the configured one
+            cache (bool, optional): Whether to serve and store the response in the response cache.
+                Defaults to caching only deterministic (temperature 0) calls
             
         Returns:
             Dict[str, Any]: Dictionary containing:
@@ -34,6 +100,76 @@ class OpenAILLMProvider:
         Raises:
             ValueError: If API key is not provided or API call fails
         """
+        api_params = self._prepare_params(
+            prompt, system_prompt, context, tools, tool_choice, response_format, model, max_tokens, temperature
+        )
+
+        # Serve from the response cache if the same request was made before
+        cache_key = self._cache_key(api_params) if self._use_cache(api_params, cache) else None
+        cached_response = self.response_cache.lookup(cache_key) if cache_key else None
+        if cached_response is not None:
+            return dict(cached_response)
+
+        # Call OpenAI API using the official client
+        try:
+            response = self.client.chat.completions.create(**api_params)
+        except Exception as e:
+            raise ValueError(f"OpenAI API error: {str(e)}")
+
+        result = {
+            "content": response.choices[0].message.content,
+            "tool_calls": response.choices[0].message.tool_calls
+        }
+        if cache_key:
+            self.response_cache.update(cache_key, result)
+        return dict(result)
+
+    async def agenerate(self, prompt: str, system_prompt: str = "", context: Context = None,
+                        tools: Optional[List[Dict[str, Any]]] = None,
+                        tool_choice: Optional[Union[str, Dict[str, Any]]] = "auto",
+                        response_format: Optional[Dict[str, Any]] = None,
+                        model: Optional[str] = None, max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None,
+                        cache: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Async version of `generate` using the AsyncOpenAI client, run it with `run_coroutine`
+
+        Takes the same arguments and returns the same response as `generate`.
+
+        Raises:
+            ValueError: If API key is not provided or API call fails
+        """
+        api_params = self._prepare_params(
+            prompt, system_prompt, context, tools, tool_choice, response_format, model, max_tokens, temperature
+        )
+
+        # Serve from the response cache if the same request was made before
+        cache_key = self._cache_key(api_params) if self._use_cache(api_params, cache) else None
+        cached_response = self.response_cache.lookup(cache_key) if cache_key else None
+        if cached_response is not None:
+            return dict(cached_response)
+
+        # Call OpenAI API using the official async client
+        try:
+            response = await self.async_client.chat.completions.create(**api_params)
+        except Exception as e:
+            raise ValueError(f"OpenAI API error: {str(e)}")
+
+        result = {
+            "content": response.choices[0].message.content,
+            "tool_calls": response.choices[0].message.tool_calls
+        }
+        if cache_key:
+            self.response_cache.update(cache_key, result)
+        return dict(result)
+
+    def _prepare_params(self, prompt: str, system_prompt: str, context: Optional[Context],
+                        tools: Optional[List[Dict[str, Any]]],
+                        tool_choice: Optional[Union[str, Dict[str, Any]]],
+                        response_format: Optional[Dict[str, Any]],
+                        model: Optional[str] = None, max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None) -> Dict[str, Any]:
+        """Build the chat completion parameters shared by the sync and async calls"""
         if not self.api_key:
             raise ValueError("API key not provided")
             
@@ -50,27 +186,31 @@ class OpenAILLMProvider:
         # Add current prompt
         messages.append({"role": "user", "content": prompt})
 
-        # Call OpenAI API using the official client
-        try:
-            # Prepare API call parameters
-            api_params = {
-                "model": self.model,
-                "messages": messages,
-                "temperature": self.config.get("temperature", 0.7),
-                "max_tokens": self.config.get("max_tokens", 1000),
-            }
-            
-            # Add tools and tool_choice if provided
-            if tools:
-                api_params["tools"] = tools
-                api_params["tool_choice"] = tool_choice
-            
-            response = self.client.chat.completions.create(**api_params)
-            
-            return {
-                "content": response.choices[0].message.content,
-                "tool_calls": response.choices[0].message.tool_calls
-            }
-            
-        except Exception as e:
-            raise ValueError(f"OpenAI API error: {str(e)}") 
+        # Prepare API call parameters
+        api_params = {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": self.config.get("temperature", 0.7) if temperature is None else temperature,
+            "max_tokens": max_tokens or self.config.get("max_tokens", 1000),
+        }
+
+        # Add tools and tool_choice if provided
+        if tools:
+            api_params["tools"] = tools
+            api_params["tool_choice"] = tool_choice
+
+        if response_format:
+            api_params["response_format"] = response_format
+
+        return api_params
+
+    @staticmethod
+    def _use_cache(api_params: Dict[str, Any], cache: Optional[bool]) -> bool:
+        """Cache deterministic calls unless told otherwise"""
+        return api_params["temperature"] == 0 if cache is None else cache
+
+    @staticmethod
+    def _cache_key(api_params: Dict[str, Any]) -> str:
+        """Stable hash of the request parameters that determine the response"""
+        payload = orjson.dumps(api_params, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(payload).hexdigest()
@@ -1,5 +1,7 @@
 from agent_marketplace.tools.coinbase_commerce import process_coinbase_payment
 
+# Tools are called with (func_args, message). A tool without side effects can set
+# `tool.idempotent = True` to have its results reused across turns
 registered_tools = {
     "process_coinbase_payment": process_coinbase_payment
 }